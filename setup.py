@@ -27,46 +27,52 @@ def read(fname):
     Utility function to read the README file.
     :rtype : String
     """
-    return open(os.path.join(os.path.dirname(__file__), fname)).read()
+    path = os.path.join(os.path.dirname(__file__), fname)
+    with open(path, encoding='utf-8') as f:
+        return f.read()
 
 
 version = '0.8.2.dev0'
 url = "https://github.com/ome/omero-cli-render/"
 
+# Get strings from http://pypi.python.org/pypi?%3Aaction=list_classifiers
+CLASSIFIERS = (
+    'Development Status :: 5 - Production/Stable',
+    'Environment :: Plugins',
+    'Intended Audience :: Developers',
+    'Intended Audience :: End Users/Desktop',
+    'License :: OSI Approved :: GNU General Public License v2 '
+    'or later (GPLv2+)',
+    'Natural Language :: English',
+    'Operating System :: OS Independent',
+    'Programming Language :: Python :: 3',
+    'Topic :: Software Development :: Libraries :: Python Modules',
+)
+
 setup(
     version=version,
-    packages=['', 'omero.plugins'],
+    packages=['omero.plugins'],
+    py_modules=['omero_cli_render'],
     package_dir={"": "src"},
     name='omero-cli-render',
     description="Plugin for use in the OMERO CLI.",
     long_description=read('README.rst'),
-    classifiers=[
-          'Development Status :: 5 - Production/Stable',
-          'Environment :: Plugins',
-          'Intended Audience :: Developers',
-          'Intended Audience :: End Users/Desktop',
-          'License :: OSI Approved :: GNU General Public License v2 '
-          'or later (GPLv2+)',
-          'Natural Language :: English',
-          'Operating System :: OS Independent',
-          'Programming Language :: Python :: 3',
-          'Topic :: Software Development :: Libraries :: Python Modules',
-      ],  # Get strings from
-          # http://pypi.python.org/pypi?%3Aaction=list_classifiers
+    long_description_content_type='text/x-rst',
+    classifiers=list(CLASSIFIERS),
     author='The Open Microscopy Team',
     author_email='ome-devel@lists.openmicroscopy.org.uk',
     license='GPL-2.0+',
     install_requires=[
-        'PyYAML',
-        'omero-py>=5.6.0',
+        'PyYAML>=5.1,<7',
+        'omero-py>=5.6.0,<6',
         ],
     python_requires='>=3.8',
-    url='%s' % url,
-    zip_safe=False,
-    download_url='%s/v%s.tar.gz' % (url, version),
+    url=url,
     keywords=['OMERO.CLI', 'plugin'],
-    tests_require=[
-        'omero-py>=5.18.0',
-        'pytest',
-        'restview'],
+    extras_require={
+        'docs': ['restview'],
+        'test': [
+            'omero-py>=5.18.0,<6',
+            'pytest>=7,<9'],
+    },
 )
@@ -18,31 +18,41 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import argparse
 import sys
 import time
 import json
 import yaml
 import omero
 
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, wraps
+from itertools import islice
 
 from pathlib import Path
 
 from omero.cli import BaseControl
 from omero.cli import CLI
 from omero.cli import ProxyStringType
-from omero.gateway import BlitzGateway, DatasetWrapper
+from omero.gateway import BlitzGateway, BlitzObjectWrapper, DatasetWrapper
 from omero.model import Image
 from omero.model import Plate
 from omero.model import Screen
 from omero.model import Dataset
 from omero.model import Project
+from omero.model import PixelsI
 from omero.model import StatsInfoI
-from omero.rtypes import rint, rdouble, rstring, rlong
+from omero.rtypes import rint, rdouble, rstring, rlong, unwrap
 from omero.util import pydict_text_io
 
 from omero import UnloadedEntityException
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
 HELP = "Tools for working with rendering settings"
 
 INFO_HELP = """Show details of a rendering setting
@@ -186,10 +196,73 @@ Examples:
 # in the yaml / json files
 SPEC_VERSION = 2
 
+# Number of target images to apply rendering settings to in a single
+# call when copying
+COPY_BATCH = 500
+
+# Default number of thumbnails generated concurrently when they are
+# requested one image at a time
+THUMB_WORKERS = 8
+
+# Styles supported by 'render info' and 'render get'
+OUTPUT_FORMATS = ['plain'] + list(pydict_text_io.get_supported_formats())
+
+
+def _chunked(iterable, n):
+    """Yield successive lists of at most n items from an iterable"""
+    it = iter(iterable)
+    chunk = list(islice(it, n))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, n))
+
+
+def _float_or_none(value):
+    """Return value as a float, or None if it is None"""
+    return float(value) if value is not None else None
+
 
-def _set_if_not_none(dictionary, k, v):
-    if v is not None:
-        dictionary[k] = v
+def _positive_int(value):
+    """Argument type for options which must be at least 1"""
+    try:
+        value = int(value)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(
+            "must be a positive integer")
+    return value
+
+
+def _get_thumbnail(tb, pixid, ctx):
+    """
+    Get the thumbnail of a Pixels set from a ThumbnailStore, creating
+    the rendering settings first if they are missing
+
+    Parameters:
+        tb (ThumbnailStorePrx): The ThumbnailStore
+        pixid (long): The Pixels ID
+        ctx (dict): The call context
+    """
+    if not tb.setPixelsId(int(pixid), ctx):
+        tb.resetDefaults(ctx)
+        tb.setPixelsId(int(pixid), ctx)
+    return tb.getThumbnailByLongestSide(rint(96), ctx)
+
+
+def _load_yaml_file(path):
+    """
+    Load a local YAML file containing a single document
+
+    Unlike pydict_text_io.load, this uses the libyaml parser when
+    available.
+    """
+    with open(path, 'rb') as f:
+        docs = list(yaml.load_all(f, Loader=SafeLoader))
+    if len(docs) != 1:
+        raise Exception(
+            "Expected YAML file with one document, found %d" % len(docs))
+    return docs[0]
 
 
 def _getversion(dictionary):
@@ -206,13 +279,14 @@ def _getversion(dictionary):
     """
 
     if 'version' not in dictionary:
-        for chindex, chdict in dictionary['channels'].items():
-            if ('start' in chdict or 'end' in chdict) and\
-               ('min' in chdict or 'max' in chdict):
+        for chdict in dictionary['channels'].values():
+            has_window = 'start' in chdict or 'end' in chdict
+            has_minmax = 'min' in chdict or 'max' in chdict
+            if has_window and has_minmax:
                 return 0
-            if 'start' in chdict or 'end' in chdict:
+            if has_window:
                 return 2
-            if 'min' in chdict or 'max' in chdict:
+            if has_minmax:
                 return 1
     else:
         v = dictionary['version']
@@ -227,17 +301,18 @@ class ChannelObject(object):
     Represents the rendering settings of a channel
 
     Parameters:
-    channel (IObject): The rendering settings as dictionary
+    channel (ChannelWrapper or dict): The channel, or its rendering
+                       settings as dictionary
     version (int):     The version of the renderings settings format
                        (optional; default: latest)
     """
 
     def __init__(self, channel, version=SPEC_VERSION):
         self.version = version
-        try:
-            self.init_from_channel(channel)
-        except AttributeError:
+        if isinstance(channel, dict):
             self.init_from_dict(channel)
+        else:
+            self.init_from_channel(channel)
 
     def init_from_channel(self, channel):
         self.emWave = channel.getEmissionWave()
@@ -259,11 +334,11 @@ class ChannelObject(object):
         self.emWave = None
         self.label = d.get('label', None)
         self.color = d.get('color', None)
-        self.min = float(d['min']) if 'min' in d else None
-        self.max = float(d['max']) if 'max' in d else None
+        self.min = _float_or_none(d.get('min'))
+        self.max = _float_or_none(d.get('max'))
         if self.version > 1:
-            self.start = float(d['start']) if 'start' in d else None
-            self.end = float(d['end']) if 'end' in d else None
+            self.start = _float_or_none(d.get('start'))
+            self.end = _float_or_none(d.get('end'))
         else:
             self.start = self.min
             self.end = self.max
@@ -298,15 +373,16 @@ class ChannelObject(object):
         label = None
         if self.label is not None:
             label = str(self.label)
-        d = {}
-        _set_if_not_none(d, 'label', label)
-        _set_if_not_none(d, 'color', color)
-        _set_if_not_none(d, 'min', self.min)
-        _set_if_not_none(d, 'max', self.max)
-        _set_if_not_none(d, 'start', self.start)
-        _set_if_not_none(d, 'end', self.end)
-        _set_if_not_none(d, 'active', self.active)
-        return d
+        fields = (
+            ('label', label),
+            ('color', color),
+            ('min', self.min),
+            ('max', self.max),
+            ('start', self.start),
+            ('end', self.end),
+            ('active', self.active),
+        )
+        return {k: v for k, v in fields if v is not None}
 
 
 class RenderObject(object):
@@ -316,37 +392,68 @@ class RenderObject(object):
         Based on omeroweb.webgateway.marshal
 
         Note: this loads a RenderingEngine and will need to
-        have the instance closed.
+        have the instance closed. Fields which are not needed by
+        :meth:`to_dict` are only loaded on first access and so
+        require the RenderingEngine to still be open at that point.
         """
         assert image
-        image.loadRenderOptions()
         self.image = image
         self.name = image.name or ''
-        self.type = image.getPixelsType()
         re_ok = image._prepareRenderingEngine()
         if not re_ok:
             raise Exception(
                 "Failed to prepare Rendering Engine for %s" % image)
 
-        self.tiles = image._re.requiresPixelsPyramid()
-        self.width = None
-        self.height = None
-        self.levels = None
-        self.zoomLevelScaling = None
-        if self.tiles:
-            self.width, self.height = image._re.getTileSize()
-            self.levels = image._re.getResolutionLevels()
-            self.zoomLevelScaling = image.getZoomLevelScaling()
-
-        self.range = image.getPixelRange()
         self.channels = [
             ChannelObject(x) for x in image.getChannels(noRE=False)]
-        self.model = image.isGreyscaleRenderingModel() and \
-            'greyscale' or 'color'
-        self.projection = image.getProjection()
+        self.model = (
+            'greyscale' if image.isGreyscaleRenderingModel() else 'color')
         self.defaultZ = image._re.getDefaultZ()
         self.defaultT = image._re.getDefaultT()
 
+    @cached_property
+    def type(self):
+        return self.image.getPixelsType()
+
+    @cached_property
+    def tiles(self):
+        return self.image._re.requiresPixelsPyramid()
+
+    @cached_property
+    def _tile_size(self):
+        if self.tiles:
+            return self.image._re.getTileSize()
+        return (None, None)
+
+    @property
+    def width(self):
+        return self._tile_size[0]
+
+    @property
+    def height(self):
+        return self._tile_size[1]
+
+    @cached_property
+    def levels(self):
+        if self.tiles:
+            return self.image._re.getResolutionLevels()
+        return None
+
+    @cached_property
+    def zoomLevelScaling(self):
+        if self.tiles:
+            return self.image.getZoomLevelScaling()
+        return None
+
+    @cached_property
+    def range(self):
+        return self.image.getPixelRange()
+
+    @cached_property
+    def projection(self):
+        self.image.loadRenderOptions()
+        return self.image.getProjection()
+
     def __str__(self):
         """Return a string representation of the render object"""
         sb = "rdefv%s: model=%s, z=%s, t=%s\n" % (
@@ -365,10 +472,10 @@ class RenderObject(object):
         for idx, ch in enumerate(self.channels, 1):
             chs[idx] = ch.to_dict()
         d['version'] = SPEC_VERSION
-        d['z'] = int(self.defaultZ+1)
-        d['t'] = int(self.defaultT+1)
+        d['z'] = self.defaultZ + 1
+        d['t'] = self.defaultT + 1
         d['channels'] = chs
-        d['greyscale'] = True if self.model == 'greyscale' else False
+        d['greyscale'] = self.model == 'greyscale'
         return d
 
 
@@ -377,15 +484,18 @@ def gateway_required(func):
     Decorator which initializes a client (self.client),
     a BlitzGateway (self.gateway), and makes sure that
     all services of the Blitzgateway are closed again.
+    Objects looked up by the command are cached for its duration.
     """
     @wraps(func)
     def _wrapper(self, *args, **kwargs):
         self.client = self.ctx.conn(*args)
         self.gateway = BlitzGateway(client_obj=self.client)
+        self._lookup_cache = {}
 
         try:
             return func(self, *args, **kwargs)
         finally:
+            self._lookup_cache = None
             if self.gateway is not None:
                 self.gateway.close(hard=False)
                 self.gateway = None
@@ -397,6 +507,7 @@ class RenderControl(BaseControl):
 
     gateway = None
     client = None
+    _lookup_cache = None
 
     def _configure(self, parser):
         parser.add_login_arguments()
@@ -425,14 +536,19 @@ class RenderControl(BaseControl):
             x.add_argument(
                 "--skipthumbs", help="Do not regenerate thumbnails "
                                      "immediately", action="store_true")
+        for x in (copy, set_cmd, impo):
+            x.add_argument(
+                "--thumb-workers", type=_positive_int, default=THUMB_WORKERS,
+                help="Number of thumbnails to regenerate concurrently for "
+                     "the images which the batch thumbnail request could "
+                     "not handle, e.g. images without rendering settings "
+                     "(default: %(default)s)")
 
-        output_formats = ['plain'] + list(
-            pydict_text_io.get_supported_formats())
         info.add_argument(
-            "--style", choices=output_formats, default='plain',
+            "--style", choices=OUTPUT_FORMATS, default='plain',
             help="Output format")
         get.add_argument(
-            "--style", choices=output_formats, default='json',
+            "--style", choices=OUTPUT_FORMATS, default='json',
             help="Output format")
 
         copy.add_argument("target", type=render_type, help=tgt_help,
@@ -473,10 +589,17 @@ class RenderControl(BaseControl):
 
     def _lookup(self, gateway, type, oid):
         # TODO: move _lookup to a _configure type
+        # Only containers are cached, images hold rendering engine state
+        key = (type, unwrap(oid))
+        cache = self._lookup_cache if type != "Image" else None
+        if cache is not None and key in cache:
+            return cache[key]
         gateway.SERVICE_OPTS.setOmeroGroup('-1')
         obj = gateway.getObject(type, oid)
         if not obj:
             self.ctx.die(110, "No such %s: %s" % (type, oid))
+        if cache is not None:
+            cache[key] = obj
         return obj
 
     def render_images(self, gateway, object, batch=100):
@@ -489,60 +612,60 @@ class RenderControl(BaseControl):
             batch (int): The batch size
 
         Returns:
-            Generator: List of images (IObjects)
+            Generator: Images if batch is 1, otherwise lists of at most
+                       batch images
+        """
+        images = self._iter_images(gateway, object)
+        if batch == 1:
+            return images
+        return _chunked(images, batch)
+
+    def _iter_images(self, gateway, object):
+        """
+        Get the images contained in an object, one at a time.
+
+        Parameters:
+            gateway (BlitzGateway): The gateway
+            object (IObject): The parent object (Project, Dataset, S, P, W).
+                              A loaded BlitzObjectWrapper is used as is.
+
+        Returns:
+            Generator: Images (ImageWrapper)
         """
+        if isinstance(object, BlitzObjectWrapper):
+            loaded, object = object, object._obj
+        else:
+            loaded = None
+
+        def lookup(type):
+            if loaded is not None:
+                return loaded
+            return self._lookup(gateway, type, object.id)
 
         if isinstance(object, list):
             for x in object:
-                for rv in self.render_images(gateway, x, batch):
-                    yield rv
+                yield from self._iter_images(gateway, x)
         elif isinstance(object, Screen):
-            scr = self._lookup(gateway, "Screen", object.id)
+            scr = lookup("Screen")
             for plate in scr.listChildren():
-                for rv in self.render_images(gateway, plate._obj, batch):
-                    yield rv
+                yield from self._iter_images(gateway, plate)
         elif isinstance(object, Plate):
-            plt = self._lookup(gateway, "Plate", object.id)
-            rv = []
-            for well in plt.listChildren():
-                for idx in range(0, well.countWellSample()):
-                    img = well.getImage(idx)
-                    if batch == 1:
-                        yield img
-                    else:
-                        rv.append(img)
-                        if len(rv) == batch:
-                            yield rv
-                            rv = []
-            if rv:
-                yield rv
+            plt = lookup("Plate")
+            yield from (
+                well.getImage(idx) for well in plt.listChildren()
+                for idx in range(well.countWellSample()))
 
         elif isinstance(object, Project):
-            prj = self._lookup(gateway, "Project", object.id)
+            prj = lookup("Project")
             for ds in prj.listChildren():
-                for rv in self.render_images(gateway, ds._obj, batch):
-                    yield rv
+                yield from self._iter_images(gateway, ds)
 
         elif isinstance(object, Dataset):
-            ds = self._lookup(gateway, "Dataset", object.id)
-            rv = []
-            for img in ds.listChildren():
-                if batch == 1:
-                    yield img
-                else:
-                    rv.append(img)
-                    if len(rv) == batch:
-                        yield rv
-                        rv = []
-            if rv:
-                yield rv
+            ds = lookup("Dataset")
+            yield from ds.listChildren()
 
         elif isinstance(object, Image):
-            img = self._lookup(gateway, "Image", object.id)
-            if batch == 1:
-                yield img
-            else:
-                yield [img]
+            yield self._lookup(gateway, "Image", object.id)
         else:
             self.ctx.die(111, "TBD: %s" % object.__class__.__name__)
 
@@ -560,18 +683,20 @@ class RenderControl(BaseControl):
         first = True
         for img in self.render_images(self.gateway, args.object, batch=1):
             try:
+                # Refuse extra images before preparing a rendering engine
+                if args.style not in ('plain', 'yaml') and not first:
+                    self.ctx.die(
+                        103,
+                        "Output styles not supported for multiple images")
                 ro = RenderObject(img)
                 if args.style == 'plain':
                     self.ctx.out(str(ro))
                 elif args.style == 'yaml':
-                    self.ctx.out(yaml.dump(ro.to_dict(), explicit_start=True,
+                    self.ctx.out(yaml.dump(ro.to_dict(), Dumper=SafeDumper,
+                                           explicit_start=True,
                                            width=80, indent=4,
                                            default_flow_style=False).rstrip())
                 else:
-                    if not first:
-                        self.ctx.die(
-                            103,
-                            "Output styles not supported for multiple images")
                     self.ctx.out(json.dumps(
                         ro.to_dict(), sort_keys=True, indent=4))
                     first = False
@@ -660,7 +785,7 @@ class RenderControl(BaseControl):
             target_dir.mkdir(exist_ok=True)
             target = target_dir / Path(f"{img.getName()}.yml")
             with target.open(mode="w", encoding="utf-8") as out:
-                out.write(yaml.dump(ro.to_dict(),
+                out.write(yaml.dump(ro.to_dict(), Dumper=SafeDumper,
                                     explicit_start=True,
                                     width=80, indent=4,
                                     default_flow_style=False).rstrip())
@@ -675,7 +800,6 @@ class RenderControl(BaseControl):
         if isinstance(args.object, Project):
             prj = self._lookup(self.gateway, "Project", args.object.id)
             for ds in prj.listChildren():
-                ds = self._lookup(self.gateway, "Dataset", ds.id)
                 for img in ds.listChildren():
                     self.__do_export(ds, img)
                     if not args.traverse:
@@ -708,8 +832,27 @@ class RenderControl(BaseControl):
     @gateway_required
     def copy(self, args):
         """ Implements the 'copy' command """
-        for src_img in self.render_images(self.gateway, args.object, batch=1):
-            for targets in self.render_images(self.gateway, args.target):
+        all_targets = None
+        sources = self.render_images(self.gateway, args.object, batch=1)
+        src_img = next(sources, None)
+        while src_img is not None:
+            # Look ahead, the targets only need to be kept in memory if
+            # there is another source image to copy to them
+            next_img = next(sources, None)
+            if all_targets is None:
+                chunks = self.render_images(
+                    self.gateway, args.target, batch=COPY_BATCH)
+                keep = next_img is not None
+                if keep:
+                    all_targets = []
+            else:
+                # Only traverse the target container once for all sources
+                chunks = _chunked(all_targets, COPY_BATCH)
+                keep = False
+
+            for targets in chunks:
+                if keep:
+                    all_targets.extend(targets)
                 batch = dict()
                 for target in targets:
                     if target.id == src_img.id:
@@ -718,20 +861,36 @@ class RenderControl(BaseControl):
                     else:
                         batch[target.id] = target
 
-                if not batch:
-                    continue
+                if batch:
+                    self._copy_batch(src_img, batch, args.skipthumbs,
+                                     args.thumb_workers)
 
-                rv = self.gateway.applySettingsToSet(src_img.id, "Image",
-                                                     list(batch.keys()))
-                for missing in rv[False]:
-                    self.ctx.err("Error: Image:%s" % missing)
-                    del batch[missing]
+            src_img = next_img
 
-                self.ctx.out("Rendering settings successfully copied \
-                              to %d images." % len(rv[True]))
+    def _copy_batch(self, src_img, batch, skipthumbs,
+                    workers=THUMB_WORKERS):
+        """
+        Apply the rendering settings of an image to a batch of images
 
-                if not args.skipthumbs:
-                    self._generate_thumbs(list(batch.values()))
+        Parameters:
+            src_img (ImageWrapper): The source image
+            batch (dict): The target images keyed by image ID
+            skipthumbs (bool): Do not regenerate the thumbnails
+            workers (int): Number of thumbnails to regenerate concurrently
+        """
+        rv = self.gateway.applySettingsToSet(src_img.id, "Image",
+                                             list(batch))
+        for missing in rv[False]:
+            self.ctx.err("Error: Image:%s" % missing)
+
+        self.ctx.out("Rendering settings successfully copied \
+                      to %d images." % len(rv[True]))
+
+        if not skipthumbs:
+            successful = set(rv[True])
+            self._generate_thumbs(
+                [img for iid, img in batch.items() if iid in successful],
+                workers=workers)
 
     def update_channel_names(self, gateway, obj, namedict):
         for targets in self.render_images(gateway, obj):
@@ -744,20 +903,90 @@ class RenderControl(BaseControl):
             self.ctx.dbg("Updated channel names for %d/%d images" % (
                 counts['updateCount'], counts['imageCount']))
 
-    def _generate_thumbs(self, images):
+    def _generate_thumbs(self, images, workers=THUMB_WORKERS):
+        # Resolve pixels and groups up front, the workers only talk to
+        # their own ThumbnailStore
+        groups = {}
         for img in images:
+            groups.setdefault(img.details.group.id.val, []).append(
+                (img, img.getPrimaryPixels().id))
+
+        # Request the thumbnails of each group in one call
+        missing = []
+        for group_id, pixels in groups.items():
             start = time.time()
-            img.getThumbnail(size=(96,), direct=False)
+            thumbs = self._generate_thumb_set(
+                [pixid for img, pixid in pixels], group_id)
             stop = time.time()
-            self.ctx.dbg("Image:%s got thumbnail in %2.2fs" % (
-                img.id, stop - start))
+            for img, pixid in pixels:
+                if thumbs.get(pixid):
+                    self.ctx.dbg("Image:%s got thumbnail in %2.2fs" % (
+                        img.id, stop - start))
+                else:
+                    missing.append((img, pixid, group_id))
+
+        # Fall back to one call per image, e.g. for images without
+        # rendering settings
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda m: self._generate_thumb(m[1], m[2]), missing)
+            for (img, pixid, group_id), (elapsed, error) in zip(
+                    missing, results):
+                if error:
+                    self.ctx.dbg("Image:%s failed to get thumbnail: %s" % (
+                        img.id, error))
+                else:
+                    self.ctx.dbg("Image:%s got thumbnail in %2.2fs" % (
+                        img.id, elapsed))
+
+    def _generate_thumb_set(self, pixids, group_id):
+        """
+        Generate the thumbnails of Pixels sets from the same group
 
-    def _read_default_planes(self, img, data, ignore_errors=False):
+        Returns:
+            dict: The thumbnails keyed by Pixels ID, empty on error
+        """
+        ctx = {'omero.group': str(group_id)}
+        tb = self.client.sf.createThumbnailStore()
+        try:
+            return tb.getThumbnailByLongestSideSet(
+                rint(96), [int(pixid) for pixid in pixids], ctx)
+        except Exception as e:
+            self.ctx.dbg("Failed to get thumbnails: %s" % (
+                str(e).split("\n")[0]))
+            return {}
+        finally:
+            tb.close()
+
+    def _generate_thumb(self, pixid, group_id):
+        """
+        Generate the thumbnail of a Pixels set
+
+        A new ThumbnailStore is created for each call rather than using
+        the gateway, which shares a single store per connection, so that
+        thumbnails can be generated concurrently.
+
+        Returns:
+            tuple: The elapsed time and the error, if any
+        """
+        start = time.time()
+        error = None
+        ctx = {'omero.group': str(group_id)}
+        tb = self.client.sf.createThumbnailStore()
+        try:
+            _get_thumbnail(tb, pixid, ctx)
+        except Exception as e:
+            error = str(e).split("\n")[0]
+        finally:
+            tb.close()
+        return (time.time() - start, error)
+
+    def _read_default_planes(self, data):
         """Read and validate the default planes"""
 
         # Read values from dictionary
-        def_z = data['z'] if 'z' in data else None
-        def_t = data['t'] if 't' in data else None
+        def_z = data.get('z')
+        def_t = data.get('t')
 
         # Minimal validation: default planes should be 1-indexed integers
         if (def_z is not None) and (def_z < 1 or int(def_z) != def_z):
@@ -766,8 +995,10 @@ class RenderControl(BaseControl):
         if (def_t is not None) and (def_t < 1 or int(def_t) != def_t):
             self.ctx.die(
                 105, "Invalid default T plane: %s" % def_t)
+        return (def_z, def_t)
 
-        # Validate default plane index against image dimensions
+    def _check_default_planes(self, img, def_z, def_t, ignore_errors=False):
+        """Validate the default planes against the image dimensions"""
         if def_z and def_z > img.getSizeZ():
             msg = ("Inconsistent default Z plane. Expected to set %s but the"
                    " image dimension is %s" % (def_z, img.getSizeZ()))
@@ -789,7 +1020,11 @@ class RenderControl(BaseControl):
     def _load_rendering_settings(self, source, session=None):
         """Load a rendering dictionary from a source (file or object)"""
         try:
-            data = pydict_text_io.load(source, session=session)
+            if isinstance(source, str) and \
+                    Path(source).suffix.lower() in ('.yml', '.yaml'):
+                data = _load_yaml_file(source)
+            else:
+                data = pydict_text_io.load(source, session=session)
         except Exception as e:
             self.ctx.dbg(e)
             self.ctx.die(103, "Could not read %s" % source)
@@ -806,7 +1041,11 @@ class RenderControl(BaseControl):
 
     def _read_channels(self, data):
         """Read new channels from settings dictionary"""
-        newchannels = {}
+        namedict = {}
+        cindices = []
+        rangelist = []
+        colourlist = []
+        minmaxlist = []
         version = _getversion(data)
         # Read channel setttings from rendering dictionary
         for chindex, chdict in data['channels'].items():
@@ -818,32 +1057,58 @@ class RenderControl(BaseControl):
                     105, "Invalid channel index: %s" % chindex)
 
             try:
-                cobj = ChannelObject(chdict, version)
-                newchannels[cindex] = cobj
-                self.ctx.dbg('%d:%s' % (cindex, cobj))
+                c = ChannelObject(chdict, version)
+                self.ctx.dbg('%d:%s' % (cindex, c))
             except Exception as e:
                 self.ctx.err('ERROR: %s' % e)
                 self.ctx.die(
                     105, "Invalid channel description: %s" % chdict)
 
-        namedict = {}
-        cindices = []
-        rangelist = []
-        colourlist = []
-        minmaxlist = []
-        for (i, c) in newchannels.items():
             if c.label:
-                namedict[i] = c.label
+                namedict[cindex] = c.label
             if c.active is False:
-                cindices.append(-i)
+                cindices.append(-cindex)
             else:
-                cindices.append(i)
+                cindices.append(cindex)
             rangelist.append([c.start, c.end])
             colourlist.append(c.color)
             minmaxlist.append([c.min, c.max])
         rv = (namedict, cindices, rangelist, colourlist, minmaxlist)
         return rv
 
+    def _set_minmax(self, img, minmaxlist):
+        """
+        Set the StatsInfo min & max of the channels of an image
+
+        Parameters:
+            img (ImageWrapper): The image
+            minmaxlist (list): The (min, max) pair of each channel, as
+                               RDouble or None if unchanged
+        """
+        channels = []
+        for minmax, ch in zip(minmaxlist, img.getChannels(noRE=True)):
+            if minmax[0] is None and minmax[1] is None:
+                continue
+            si = ch.getStatsInfo()
+            if si is None:
+                si = StatsInfoI()
+            else:
+                si = si._obj
+            if minmax[0] is not None:
+                si.globalMin = minmax[0]
+            if minmax[1] is not None:
+                si.globalMax = minmax[1]
+            ch._obj.statsInfo = si
+            # As in ChannelWrapper.save(), do not save the Pixels back
+            ch._obj.setPixels(PixelsI(ch._obj.getPixels().getId(), False))
+            channels.append(ch._obj)
+
+        if channels:
+            # Save all the channels at once in the group of the image
+            ctx = self.gateway.SERVICE_OPTS.copy()
+            ctx.setOmeroGroup(img.details.group.id.val)
+            self.gateway.getUpdateService().saveArray(channels, ctx)
+
     @gateway_required
     def set(self, args):
         """ Implements the 'set' command """
@@ -854,70 +1119,79 @@ class RenderControl(BaseControl):
         greyscale = data.get('greyscale', None)
         if greyscale is not None:
             self.ctx.dbg('greyscale=%s' % greyscale)
+        (def_z, def_t) = self._read_default_planes(data)
+        # Wrap min & max once, they are the same for every image
+        minmaxlist = [
+            tuple(rdouble(v) if v is not None else None for v in minmax)
+            for minmax in minmaxlist]
+        # Only load the channels from the server if they need updating
+        set_minmax = any(
+            minmax[0] is not None or minmax[1] is not None
+            for minmax in minmaxlist)
 
         iids = []
-        for img in self.render_images(self.gateway, args.object, batch=1):
-            iids.append(img.id)
-
-            (def_z, def_t) = self._read_default_planes(
-                img, data, ignore_errors=args.ignore_errors)
-
-            active_channels = []
-            if not args.disable:
-                # Calling set_active_channels will disable channels which
-                # are not specified.
-                # Need to reset ALL active channels after set_active_channels()
-                imgchannels = img.getChannels()
-                for ci, ch in enumerate(imgchannels, 1):
-                    if (-ci not in cindices and ch.isActive()) \
-                            or ci in cindices:
-                        active_channels.append(ci)
-
-            img.set_active_channels(
-                cindices, windows=rangelist, colors=colourlist,
-                set_inactive=True)
-
-            if greyscale is not None:
-                if greyscale:
-                    img.setGreyscaleRenderingModel()
-                else:
-                    img.setColorRenderingModel()
-
-            # Re-activate any un-listed channels
-            if len(active_channels) > 0:
-                img.set_active_channels(active_channels)
-
-            # Set statsInfo min & max
-            for minmax, ch in zip(minmaxlist, img.getChannels(noRE=True)):
-                if minmax[0] is None and minmax[1] is None:
-                    continue
-                si = ch.getStatsInfo()
-                if si is None:
-                    si = StatsInfoI()
-                else:
-                    si = si._obj
-                if minmax[0] is not None:
-                    si.globalMin = rdouble(minmax[0])
-                if minmax[1] is not None:
-                    si.globalMax = rdouble(minmax[1])
-                ch._obj.statsInfo = si
-                ch.save()
-
-            if def_z:
-                img.setDefaultZ(def_z - 1)
-            if def_t:
-                img.setDefaultT(def_t - 1)
-
+        for images in self.render_images(self.gateway, args.object):
+            # Thumbnails of the whole batch are generated together
+            saved = []
             try:
-                img.saveDefaults()
-                self.ctx.dbg(
-                    "Updated rendering settings for Image:%s" % img.id)
-                if not args.skipthumbs:
-                    self._generate_thumbs([img])
-            except Exception as e:
-                self.ctx.err('ERROR: %s' % e)
+                for img in images:
+                    iids.append(img.id)
+
+                    (img_z, img_t) = self._check_default_planes(
+                        img, def_z, def_t, ignore_errors=args.ignore_errors)
+
+                    active_channels = []
+                    if not args.disable:
+                        # Calling set_active_channels will disable channels
+                        # which are not specified.
+                        # Need to reset ALL active channels after
+                        # set_active_channels()
+                        # Listed channels are active anyway, only ask the
+                        # rendering engine about the others
+                        imgchannels = img.getChannels()
+                        for ci, ch in enumerate(imgchannels, 1):
+                            if ci in cindices or \
+                                    (-ci not in cindices and ch.isActive()):
+                                active_channels.append(ci)
+
+                    img.set_active_channels(
+                        cindices, windows=rangelist, colors=colourlist,
+                        set_inactive=True)
+
+                    if greyscale is not None:
+                        if greyscale:
+                            img.setGreyscaleRenderingModel()
+                        else:
+                            img.setColorRenderingModel()
+
+                    # Re-activate any un-listed channels
+                    if len(active_channels) > 0:
+                        img.set_active_channels(active_channels)
+
+                    # Set statsInfo min & max
+                    if set_minmax:
+                        self._set_minmax(img, minmaxlist)
+
+                    if img_z:
+                        img.setDefaultZ(img_z - 1)
+                    if img_t:
+                        img.setDefaultT(img_t - 1)
+
+                    try:
+                        img.saveDefaults()
+                        self.ctx.dbg(
+                            "Updated rendering settings for Image:%s" % img.id)
+                        saved.append(img)
+                    except Exception as e:
+                        self.ctx.err('ERROR: %s' % e)
+                    finally:
+                        img._closeRE()
             finally:
-                img._closeRE()
+                # Also when an image fails, e.g. on inconsistent default
+                # planes, the images saved so far get their thumbnails
+                if saved and not args.skipthumbs:
+                    self._generate_thumbs(
+                        saved, workers=args.thumb_workers)
 
         if not iids:
             self.ctx.die(113, "ERROR: No images found for %s %d" %
@@ -933,11 +1207,61 @@ class RenderControl(BaseControl):
     def test(self, args):
         """ Implements the 'test' command """
         self.gateway.SERVICE_OPTS.setOmeroGroup('-1')
-        for img in self.render_images(self.gateway, args.object, batch=1):
-            self.test_per_image(
-                self.client, img, args.force, args.thumb)
+        stores = {}
+        try:
+            for img in self.render_images(self.gateway, args.object,
+                                          batch=1):
+                self._test_per_image(
+                    self.client, img, args.force, args.thumb, stores)
+        finally:
+            self._close_stores(stores)
+
+    def _get_store(self, client, stores, create, group_id):
+        """
+        Get a stateful service from a cache, creating it if missing.
+
+        Stateful services are bound to the group of their first use,
+        hence the cache is keyed by group.
+
+        Parameters:
+            client (omero.client): The client
+            stores (dict): The cached services
+            create (str): The ServiceFactory method creating the service
+            group_id (int): The group the service is used in
+        """
+        key = (create, group_id)
+        if key not in stores:
+            stores[key] = getattr(client.sf, create)()
+        return stores[key]
 
-    def test_per_image(self, client, img, force, thumb):
+    def _close_stores(self, stores):
+        """Close the services cached by _get_store"""
+        for store in stores.values():
+            store.close()
+
+    def test_per_image(self, client, img, force, thumb, stores=None):
+        """
+        Test the pixel data, and optionally the thumbnail, of an image
+
+        Parameters:
+            client (omero.client): The client
+            img (ImageWrapper): The image
+            force (bool): Create the pixel data file if missing
+            thumb (bool): Also test the thumbnail retrieval
+            stores (dict): The cached services, see _get_store. The
+                           caller is responsible for closing them. If
+                           None, the services are only opened for this
+                           image and closed again.
+        """
+        if stores is not None:
+            return self._test_per_image(client, img, force, thumb, stores)
+        stores = {}
+        try:
+            return self._test_per_image(client, img, force, thumb, stores)
+        finally:
+            self._close_stores(stores)
+
+    def _test_per_image(self, client, img, force, thumb, stores):
         ctx = {'omero.group': '-1'}
         fail = {"omero.pixeldata.fail_if_missing": "true"}
         fail.update(ctx)
@@ -946,7 +1270,9 @@ class RenderControl(BaseControl):
 
         start = time.time()
         error = ""
-        rps = client.sf.createRawPixelsStore()
+        group_id = img.details.group.id.val
+        rps = self._get_store(
+            client, stores, 'createRawPixelsStore', group_id)
 
         pixid = img.getPrimaryPixels().id
 
@@ -957,9 +1283,7 @@ class RenderControl(BaseControl):
             error = e
             msg = "miss:"
 
-        if msg == "ok:" or not force:
-            rps.close()
-        else:
+        if msg != "ok:" and force:
             try:
                 rps.setPixelsId(int(pixid), False, make)
                 msg = "fill:"
@@ -969,28 +1293,18 @@ class RenderControl(BaseControl):
             except Exception as e:
                 msg = "fail:"
                 error = e
-            finally:
-                rps.close()
 
         if error:
             error = str(error).split("\n")[0]
         elif thumb:
-            ctx = {'omero.group': str(img.details.group.id.val)}
-            tb = client.sf.createThumbnailStore()
+            ctx = {'omero.group': str(group_id)}
+            tb = self._get_store(
+                client, stores, 'createThumbnailStore', group_id)
             try:
-                has_rendering_settings = tb.setPixelsId(int(pixid), ctx)
-                if not has_rendering_settings:
-                    try:
-                        tb.resetDefaults(ctx)
-                        tb.setPixelsId(int(pixid), ctx)
-                        tb.getThumbnailByLongestSide(rint(96), ctx)
-                    except Exception as e:
-                        msg = "fail:"
-                        error = e
-                else:
-                    tb.getThumbnailByLongestSide(rint(96), ctx)
-            finally:
-                tb.close()
+                _get_thumbnail(tb, pixid, ctx)
+            except Exception as e:
+                msg = "fail:"
+                error = e
 
         stop = time.time()
         self.ctx.out("%s Pixels:%s Image:%s %s %s" %
@@ -34,9 +34,24 @@ import os.path
 SUPPORTED = [
     "idonly", "imageid", "plateid", "screenid", "datasetid", "projectid"]
 
+# Files with the expected output of 'render info' for each style
+DIR_NAME = os.path.dirname(os.path.abspath(__file__))
+EXPECTED_INFO = {
+    'plain': 'info.plain', 'json': 'info.json', 'yaml': 'info.yml'}
+
+# Colors of the channels in the rendering settings of the tests
+COLORS = ('123456', '789ABC', 'DEF012', '345678')
+
 
 class TestRender(CLITest):
 
+    @classmethod
+    def setup_class(cls):
+        super(TestRender, cls).setup_class()
+        # Images which are only read by the tests, keyed by the
+        # arguments of create_image
+        cls.shared_images = {}
+
     def setup_method(self, method):
         super(TestRender, self).setup_method(method)
         self.cli.register("render", RenderControl, "TEST")
@@ -50,7 +65,33 @@ class TestRender(CLITest):
         self.datasetid = "Dataset:-1"
         self.projectid = "Project:-1"
 
-    def create_image(self, sizec=4, sizez=1, sizet=1, target_name=None):
+    @pytest.fixture(scope="class")
+    def expected_info(self):
+        expected = {}
+        for style, name in EXPECTED_INFO.items():
+            with open(os.path.join(DIR_NAME, name), 'r') as f:
+                expected[style] = f.read()
+        return expected
+
+    def create_image(self, sizec=4, sizez=1, sizet=1, target_name=None,
+                     shared=False, preload_thumbnails=False):
+        """
+        Import images for a test
+
+        If shared is True, the images imported by an earlier call with the
+        same arguments are reused. Only use it in tests which do not
+        check the rendering settings they may modify.
+        If preload_thumbnails is True, a thumbnail is generated for every
+        imported image, which also creates its rendering settings.
+        """
+        key = (sizec, sizez, sizet, target_name, preload_thumbnails)
+        if shared and key in self.shared_images:
+            for attr, value in self.shared_images[key].items():
+                setattr(self, attr, value)
+            return
+
+        # Record the attributes set below for reuse by shared calls
+        before = dict(vars(self))
         self.gw = BlitzGateway(client_obj=self.client)
         if target_name == "plateid" or target_name == "screenid":
             self.plates = []
@@ -70,13 +111,14 @@ class TestRender(CLITest):
                 self.plates[0].listChildren())[0].getImage(index=1)
             self.source = "Image:%s" % self.source.id
 
-            # And for all the images, pre-load a thumbnail
-            for p in self.plates:
-                for w in p.listChildren():
-                    for i in range(w.countWellSample()):
-                        img = w.getImage(index=i)
-                        img.getThumbnail(
-                            size=(96,), direct=False)
+            if preload_thumbnails:
+                # And for all the images, pre-load a thumbnail
+                for p in self.plates:
+                    for w in p.listChildren():
+                        for i in range(w.countWellSample()):
+                            img = w.getImage(index=i)
+                            img.getThumbnail(
+                                size=(96,), direct=False)
         else:
             images = self.import_fake_file(
                 images_count=2, sizeZ=sizez, sizeT=sizet, sizeC=sizec,
@@ -84,9 +126,10 @@ class TestRender(CLITest):
             self.idonly = "%s" % images[0].id.val
             self.imageid = "Image:%s" % images[0].id.val
             self.source = "Image:%s" % images[1].id.val
-            for image in images:
-                img = self.gw.getObject("Image", image.id.val)
-                img.getThumbnail(size=(96,), direct=False)
+            if preload_thumbnails:
+                for image in images:
+                    img = self.gw.getObject("Image", image.id.val)
+                    img.getThumbnail(size=(96,), direct=False)
 
         if target_name == "datasetid" or target_name == "projectid":
             # Create Project/Dataset hierarchy
@@ -100,18 +143,21 @@ class TestRender(CLITest):
             for i in images:
                 self.link(obj1=dataset, obj2=i)
 
+        if shared:
+            self.shared_images[key] = {
+                attr: value for attr, value in vars(self).items()
+                if attr not in before or before[attr] is not value}
+
     def get_target_imageids(self, target):
         if target in (self.idonly, self.imageid):
             return [self.idonly]
-        if target == self.plateid:
+        if target in (self.plateid, self.screenid):
+            plates = self.plates if target == self.screenid else \
+                self.plates[:1]
             imgs = []
-            for w in self.plates[0].listChildren():
-                imgs.extend([w.getImage(0).id, w.getImage(1).id])
-            return imgs
-        if target == self.screenid:
-            imgs = []
-            for s in self.plates:
-                for w in self.plates[0].listChildren():
+            # The wells are loaded together with their images
+            for p in plates:
+                for w in p.listChildren():
                     imgs.extend([w.getImage(0).id, w.getImage(1).id])
             return imgs
         if target == self.datasetid:
@@ -129,32 +175,17 @@ class TestRender(CLITest):
 
     def get_render_def(self, sizec=4, greyscale=None, version=2, windows=True,
                        z=None, t=None):
-        # Define channels with labels and colors
-        channels = {}
-        channels[1] = {
-            'label': self.uuid(),
-            'color': '123456',
-        }
-        channels[2] = {
-            'label': self.uuid(),
-            'color': '789ABC',
-        }
-        channels[3] = {
-            'label': self.uuid(),
-            'color': 'DEF012',
-        }
-        channels[4] = {
-            'label': self.uuid(),
-            'color': '345678',
-        }
-
-        if windows:
-            # Define rendering windows
-            start = 'start' if version > 1 else 'min'
-            end = 'end' if version > 1 else 'max'
-            for i in range(sizec):
-                channels[i + 1].update(
-                    {start: (i + i) * 11, end: (i + i) * 22})
+        # Define channels with labels, colors and rendering windows
+        start = 'start' if version > 1 else 'min'
+        end = 'end' if version > 1 else 'max'
+        channels = {
+            i + 1: {
+                'label': self.uuid(),
+                'color': COLORS[i],
+                **({start: (i + i) * 11, end: (i + i) * 22}
+                   if windows else {}),
+            }
+            for i in range(sizec)}
 
         d = {'channels': channels}
 
@@ -164,8 +195,6 @@ class TestRender(CLITest):
             d['t'] = t
         if z is not None:
             d['z'] = z
-        for k in range(sizec, 4):
-            del channels[k + 1]
         d['version'] = version
         return d
 
@@ -173,9 +202,10 @@ class TestRender(CLITest):
         """Check the rendering setting of all images containing in a target"""
         iids = self.get_target_imageids(target)
         gw = BlitzGateway(client_obj=self.client)
-        for iid in iids:
-            # Get the updated object
-            img = gw.getObject('Image', iid)
+        # Get the updated objects in a single query
+        imgs = list(gw.getObjects('Image', [int(iid) for iid in iids]))
+        assert len(imgs) == len(set(iids))
+        for img in imgs:
             # Note: calling _prepareRE below does NOT suffice!
             img._prepareRenderingEngine()  # Call *before* getChannels
             # Passing noRE to getChannels below also prevents leaking
@@ -195,16 +225,18 @@ class TestRender(CLITest):
             else:
                 self.assert_image_rmodel(img, rdef.get('greyscale'))
 
-            if 't' in rdef and rdef['t'] <= img.getSizeT():
+            size_t = img.getSizeT()
+            size_z = img.getSizeZ()
+            if 't' in rdef and rdef['t'] <= size_t:
                 assert img.getDefaultT() == rdef.get('t') - 1
             else:
                 # If not set, default T plane is the first one
                 assert img.getDefaultT() == 0
-            if 'z' in rdef and rdef['z'] <= img.getSizeZ():
+            if 'z' in rdef and rdef['z'] <= size_z:
                 assert img.getDefaultZ() == rdef.get('z') - 1
             else:
                 # If not set, default Z plane is the middle one
-                assert img.getDefaultZ() == (int)(img.getSizeZ() // 2)
+                assert img.getDefaultZ() == size_z // 2
 
     def assert_channel_rdef(self, channel, rdef, version=2):
         assert channel.getLabel() == rdef['label']
@@ -227,7 +259,7 @@ class TestRender(CLITest):
 
     @pytest.mark.permissions
     def test_cross_group(self, capsys):
-        self.create_image(sizec=1)
+        self.create_image(sizec=1, preload_thumbnails=True)
         login = self.root_login_args()
         # Run test as self and as root
         self.cli.invoke(self.args + ["test", self.imageid], strict=True)
@@ -239,39 +271,37 @@ class TestRender(CLITest):
 
     @pytest.mark.parametrize('target_name', sorted(SUPPORTED))
     def test_non_existing_image(self, target_name, tmpdir):
-        self.args += ["info", getattr(self, target_name)]
+        args = self.args + ["info", getattr(self, target_name)]
         with pytest.raises(NonZeroReturnCode):
-            self.cli.invoke(self.args, strict=True)
+            self.cli.invoke(args, strict=True)
 
     @pytest.mark.parametrize('target_name', sorted(SUPPORTED))
     def test_info(self, target_name, tmpdir):
-        self.create_image(target_name=target_name)
+        self.create_image(
+            target_name=target_name, shared=True, preload_thumbnails=True)
         target = getattr(self, target_name)
-        self.args += ["info", target]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["info", target]
+        self.cli.invoke(args, strict=True)
 
     @pytest.mark.parametrize('style', ['plain', 'json', 'yaml'])
-    def test_info_style(self, style, capsys):
-        self.create_image()
+    def test_info_style(self, style, expected_info, capsys):
+        self.create_image(shared=True)
         target = self.imageid
-        self.args += ["info", target]
-        self.args += ['--style', style]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["info", target]
+        args += ['--style', style]
+        self.cli.invoke(args, strict=True)
         out, err = capsys.readouterr()
-
-        dir_name = os.path.dirname(os.path.abspath(__file__))
-        expected_file = {
-            'plain': 'info.plain', 'json': 'info.json', 'yaml': 'info.yml'}
-        with open(os.path.join(dir_name, expected_file[style]), 'r') as f:
-            assert out == f.read()
+        assert out == expected_info[style]
         assert 'Error printing text' not in err
 
     @pytest.mark.parametrize('target_name', sorted(SUPPORTED))
     def test_copy(self, target_name, tmpdir):
-        self.create_image(target_name=target_name)
+        # Reuses the images of test_info, which only reads them
+        self.create_image(
+            target_name=target_name, shared=True, preload_thumbnails=True)
         target = getattr(self, target_name)
-        self.args += ["copy", self.source, target]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["copy", self.source, target]
+        self.cli.invoke(args, strict=True)
 
     @pytest.mark.parametrize('sizec', [1, 2, 4])
     @pytest.mark.parametrize('greyscale', [None, True, False])
@@ -280,8 +310,8 @@ class TestRender(CLITest):
         rd = self.get_render_def(sizec=sizec, greyscale=greyscale)
         rdfile = tmpdir.join('render-test.json')
         rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", self.idonly, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
 
     @pytest.mark.parametrize('version', [1, 2])
@@ -291,8 +321,8 @@ class TestRender(CLITest):
         rd = self.get_render_def(version=version, windows=windows)
         rdfile = tmpdir.join('render-test.json')
         rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", self.idonly, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
 
     def test_set_minmax(self, tmpdir):
@@ -305,14 +335,14 @@ class TestRender(CLITest):
         rd['channels'][2]['max'] = 500
         rdfile = tmpdir.join('render-test.json')
         rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", self.idonly, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
         # But it is possible to update min OR max alone
         rd = self.get_render_def(version=2)
         rd['channels'][1]['min'] = 25
         rdfile.write(json.dumps(rd))
-        self.cli.invoke(self.args, strict=True)
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
 
     @pytest.mark.parametrize('target_name', sorted(SUPPORTED))
@@ -323,8 +353,8 @@ class TestRender(CLITest):
         rdfile = tmpdir.join('render-test-editsinglec.json')
         rdfile.write(json.dumps(rd))
         target = getattr(self, target_name)
-        self.args += ["set", target, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", target, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(target, rd)
 
     @pytest.mark.parametrize('z', [None, 2, 5])
@@ -334,26 +364,21 @@ class TestRender(CLITest):
         rd = self.get_render_def(z=z, t=t)
         rdfile = tmpdir.join('render-test-setdefaults.json')
         rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", self.idonly, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
 
+    @pytest.mark.parametrize('axis', ['z', 't'])
     @pytest.mark.parametrize('invalid_value', [0, 0.5])
-    def test_set_invalid_defaults(self, invalid_value, tmpdir):
-        self.create_image()
-        rd = self.get_render_def(z=invalid_value)
+    def test_set_invalid_defaults(self, axis, invalid_value, tmpdir):
+        # The defaults are rejected before any image is modified
+        self.create_image(shared=True)
+        rd = self.get_render_def(**{axis: invalid_value})
         rdfile = tmpdir.join('render-test-setinvaliddefaults.json')
         rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
+        args = self.args + ["set", self.idonly, str(rdfile)]
         with pytest.raises(NonZeroReturnCode):
-            self.cli.invoke(self.args, strict=True)
-
-        rd = self.get_render_def(t=invalid_value)
-        rdfile = tmpdir.join('render-test-setinvaliddefaults.json')
-        rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
-        with pytest.raises(NonZeroReturnCode):
-            self.cli.invoke(self.args, strict=True)
+            self.cli.invoke(args, strict=True)
 
     @pytest.mark.parametrize('z, t', [
         (6, None), (6, 8), (None, 8)])
@@ -365,13 +390,13 @@ class TestRender(CLITest):
 
         # Default behavior should be to error on mismatching
         # plane index/image dimensions
-        self.args += ["set", self.idonly, str(rdfile)]
+        args = self.args + ["set", self.idonly, str(rdfile)]
         with pytest.raises(NonZeroReturnCode):
-            self.cli.invoke(self.args, strict=True)
+            self.cli.invoke(args, strict=True)
 
         # With ignore-errors, the default planes should be ignored
-        self.args += ["--ignore-errors"]
-        self.cli.invoke(self.args, strict=True)
+        args += ["--ignore-errors"]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
 
     def test_disable_flag(self, tmpdir):
@@ -389,15 +414,15 @@ class TestRender(CLITest):
         }}
         rdfile = tmpdir.join('render-test.json')
         rdfile.write(json.dumps(rd))
-        self.args += ["set", self.idonly, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", self.idonly, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         # re-load image - check all channels still active
         image = gw.getObject('Image', self.idonly)
         for ch in image.getChannels():
             assert ch.isActive()
         # Re-run with --disable flag
-        self.args += ["--disable"]
-        self.cli.invoke(self.args, strict=True)
+        args += ["--disable"]
+        self.cli.invoke(args, strict=True)
         # re-load image - check ONLY first channel is active
         image = gw.getObject('Image', self.idonly)
         for idx, ch in enumerate(image.getChannels()):
@@ -412,16 +437,16 @@ class TestRender(CLITest):
         rdfile = tmpdir.join('render-test-setinactive.json')
         rdfile.write(json.dumps(rd))
 
-        self.args += ["set", self.idonly, str(rdfile)]
-        self.cli.invoke(self.args, strict=True)
+        args = self.args + ["set", self.idonly, str(rdfile)]
+        self.cli.invoke(args, strict=True)
         self.assert_target_rdef(self.idonly, rd)
 
     def test_thumb_no_renderingdef(self):
         """Test thumbnail generation when the Image has no RenderingDef"""
-        self.create_image()
-        self.delete_args += [
+        self.create_image(preload_thumbnails=True)
+        delete_args = self.delete_args + [
             "Image/Thumbnail:" + self.idonly,
             "Image/RenderingDef:" + self.idonly]
-        self.cli.invoke(self.delete_args, strict=True)
-        self.args += ["test", "--thumb", self.idonly]
-        self.cli.invoke(self.args, strict=True)
+        self.cli.invoke(delete_args, strict=True)
+        args = self.args + ["test", "--thumb", self.idonly]
+        self.cli.invoke(args, strict=True)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (C) 2026 University of Dundee & Open Microscopy Environment.
+# All rights reserved.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+from argparse import Namespace
+from types import SimpleNamespace
+
+from omero.cli import CLI
+import omero_cli_render
+from omero_cli_render import RenderControl, _chunked
+
+import pytest
+
+
+@pytest.fixture
+def render():
+    cli = CLI()
+    cli.register("render", RenderControl, "TEST")
+    return cli.controls['render']
+
+
+class TestCopy:
+
+    def copy(self, render, monkeypatch, source_ids, target_ids):
+        """
+        Run 'copy' without a server
+
+        Returns:
+            tuple: The number of times the targets were walked and the
+                   (source ID, target IDs) of each _copy_batch call
+        """
+        walks = []
+        calls = []
+
+        def render_images(gateway, object, batch=100):
+            images = (SimpleNamespace(id=iid) for iid in object)
+            if object is source_ids:
+                assert batch == 1
+                return images
+            walks.append(object)
+            return _chunked(images, batch)
+
+        def copy_batch(src_img, batch, skipthumbs, workers):
+            calls.append((src_img.id, list(batch)))
+
+        monkeypatch.setattr(omero_cli_render, "COPY_BATCH", 2)
+        monkeypatch.setattr(render, "render_images", render_images)
+        monkeypatch.setattr(render, "_copy_batch", copy_batch)
+        args = Namespace(object=source_ids, target=target_ids,
+                         skipthumbs=True, thumb_workers=1)
+        # Skip gateway_required, no connection is needed
+        RenderControl.copy.__wrapped__(render, args)
+        return len(walks), calls
+
+    @pytest.mark.parametrize('source_ids', [[1], [1, 2], [1, 2, 3]])
+    def test_every_source_to_every_target(self, render, monkeypatch,
+                                          source_ids):
+        target_ids = [1, 10, 11, 12, 13]
+        walks, calls = self.copy(render, monkeypatch, source_ids, target_ids)
+        assert walks == 1
+        for src_id in source_ids:
+            copied = [iid for s, batch in calls if s == src_id
+                      for iid in batch]
+            assert copied == [iid for iid in target_ids if iid != src_id]
+        # Targets are applied in batches of at most COPY_BATCH
+        assert all(len(batch) <= 2 for s, batch in calls)
+
+    def test_no_source(self, render, monkeypatch):
+        walks, calls = self.copy(render, monkeypatch, [], [10, 11])
+        assert walks == 0
+        assert calls == []
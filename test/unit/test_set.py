@@ -35,91 +35,112 @@ def write_yaml(d, tmpdir):
     return str(f)
 
 
-class TestLoadRenderingSettings:
-    def setup_method(self):
-        self.cli = CLI()
-        self.cli.register("render", RenderControl, "TEST")
-        self.render = self.cli.controls['render']
+@pytest.fixture(scope="class")
+def render():
+    cli = CLI()
+    cli.register("render", RenderControl, "TEST")
+    return cli.controls['render']
+
 
-    def test_none(self):
+class TestLoadRenderingSettings:
+    def test_none(self, render):
         with pytest.raises(NonZeroReturnCode):
-            self.render._load_rendering_settings(None)
+            render._load_rendering_settings(None)
 
-    def test_non_existing_file(self):
+    def test_non_existing_file(self, render):
+        with pytest.raises(NonZeroReturnCode) as e:
+            render._load_rendering_settings(str(uuid.uuid4()) + '.yml')
+        assert e.value.rv == 103
+
+    def test_multiple_documents(self, render, tmpdir):
+        d = {'channels': {1: {'label': 'foo'}}}
+        f = tmpdir.join(str(uuid.uuid4()) + ".yml")
+        f.write(yaml.dump_all([d, d], explicit_start=True))
         with pytest.raises(NonZeroReturnCode) as e:
-            self.render._load_rendering_settings(str(uuid.uuid4()) + '.yml')
+            render._load_rendering_settings(str(f))
         assert e.value.rv == 103
 
-    def test_no_channels(self, tmpdir):
+    def test_no_channels(self, render, tmpdir):
         d = {'version': 1}
         f = write_yaml(d, tmpdir)
         with pytest.raises(NonZeroReturnCode) as e:
-            self.render._load_rendering_settings(f)
+            render._load_rendering_settings(f)
         assert e.value.rv == 104
 
-    def test_missing_version_pass(self, tmpdir):
+    def test_missing_version_pass(self, render, tmpdir):
         d = {'channels': {1: {'label': 'foo'}}}
         f = write_yaml(d, tmpdir)
-        data = self.render._load_rendering_settings(f)
+        data = render._load_rendering_settings(f)
         assert data == d
         assert _getversion(d) == SPEC_VERSION
 
     @pytest.mark.parametrize('key1', ['start', 'end'])
     @pytest.mark.parametrize('key2', ['min', 'max'])
-    def test_missing_version_fail(self, tmpdir, key1, key2):
+    def test_missing_version_fail(self, render, tmpdir, key1, key2):
         d = {'channels': {1: {key1: 100, key2: 200}}}
         f = write_yaml(d, tmpdir)
         with pytest.raises(NonZeroReturnCode) as e:
-            self.render._load_rendering_settings(f)
+            render._load_rendering_settings(f)
         assert e.value.rv == 124
 
     @pytest.mark.parametrize('key', ['start', 'end'])
-    def test_version_2(self, tmpdir, key):
+    def test_version_2(self, render, tmpdir, key):
         d = {'channels': {1: {key: 100, 'label': 'foo'}}}
         f = write_yaml(d, tmpdir)
-        data = self.render._load_rendering_settings(f)
+        data = render._load_rendering_settings(f)
         assert data == d
         assert _getversion(d) == 2
 
     @pytest.mark.parametrize('key', ['min', 'max'])
-    def test_version_1(self, tmpdir, key):
+    def test_version_1(self, render, tmpdir, key):
         d = {'channels': {1: {key: 100, 'label': 'foo'}}}
         f = write_yaml(d, tmpdir)
-        data = self.render._load_rendering_settings(f)
+        data = render._load_rendering_settings(f)
         assert data == d
         assert _getversion(d) == 1
 
     @pytest.mark.parametrize('version', [1, 2])
-    def test_version_detection(self, tmpdir, version):
+    def test_version_detection(self, render, tmpdir, version):
         d = {'version': version, 'channels': {1: {'label': 'foo'}}}
         f = write_yaml(d, tmpdir)
-        data = self.render._load_rendering_settings(f)
+        data = render._load_rendering_settings(f)
         assert data == d
         assert _getversion(d) == version
 
-    def test_version_fail(self, tmpdir):
+    def test_version_fail(self, render, tmpdir):
         d = {'version': 0, 'channels': {1: {'label': 'foo'}}}
         f = write_yaml(d, tmpdir)
         with pytest.raises(NonZeroReturnCode) as e:
-            self.render._load_rendering_settings(f)
+            render._load_rendering_settings(f)
         assert e.value.rv == 124
 
 
 class TestReadChannels:
-    def setup_method(self):
-        self.cli = CLI()
-        self.cli.register("render", RenderControl, "TEST")
-        self.render = self.cli.controls['render']
-
-    def test_non_integer_channel(self):
+    def test_non_integer_channel(self, render):
         d = {'channels': {'GFP': {'label': 'foo'}}}
         with pytest.raises(NonZeroReturnCode) as e:
-            self.render._read_channels(d)
+            render._read_channels(d)
         assert e.value.rv == 105
 
     @pytest.mark.parametrize('key', ['min', 'max', 'start', 'end'])
-    def test_float_keys(self, key):
+    def test_float_keys(self, render, key):
         d = {'channels': {1: {key: 'foo'}}}
         with pytest.raises(NonZeroReturnCode) as e:
-            self.render._read_channels(d)
+            render._read_channels(d)
+        assert e.value.rv == 105
+
+
+class TestReadDefaultPlanes:
+    def test_missing(self, render):
+        assert render._read_default_planes({}) == (None, None)
+
+    def test_valid(self, render):
+        d = {'z': 2, 't': 3}
+        assert render._read_default_planes(d) == (2, 3)
+
+    @pytest.mark.parametrize('key', ['z', 't'])
+    @pytest.mark.parametrize('value', [0, -1, 1.5])
+    def test_invalid(self, render, key, value):
+        with pytest.raises(NonZeroReturnCode) as e:
+            render._read_default_planes({key: value})
         assert e.value.rv == 105